@@ -20,18 +20,23 @@ def download_github_directory(
     from bs4 import BeautifulSoup
 
     headers = {"Authorization": f"token {github_token}"} if github_token else {}
+
+    # Reuse one keep-alive session for every API call
+    session = requests.Session()
+    session.headers.update(headers)
     api_url = f"https://api.github.com/repos/{repo_owner}/{repo_name}/contents/{directory_path}"
+    doc_extensions = ('.md', '.html')
 
     def get_files_recursive(url):
         files = []
         try:
-            response = requests.get(url, headers=headers)
+            response = session.get(url)
             response.raise_for_status()
             items = response.json()
 
             for item in items:
-                if item['type'] == 'file' and (item['name'].endswith('.md') or item['name'].endswith('.html')):
-                    file_response = requests.get(item['url'], headers=headers)
+                if item['type'] == 'file' and item['name'].endswith(doc_extensions):
+                    file_response = session.get(item['url'])
                     file_response.raise_for_status()
                     file_data = file_response.json()
                     content = base64.b64decode(file_data['content']).decode('utf-8')
@@ -85,7 +90,37 @@ def chunk_and_embed(
     model = SentenceTransformer('sentence-transformers/all-mpnet-base-v2')
     print("Model loaded on CPU")
 
+    # Cleaning rules as (pattern, replacement), compiled once for the whole run
+    cleaning_rules = [
+        # Remove Hugo frontmatter (both --- and +++ styles)
+        (re.compile(r'^\s*[+\-]{3,}.*?[+\-]{3,}\s*', re.DOTALL | re.MULTILINE), ''),
+        # Remove Hugo template syntax
+        (re.compile(r'\{\{.*?\}\}', re.DOTALL), ''),
+        # Remove HTML comments and tags
+        (re.compile(r'<!--.*?-->', re.DOTALL), ''),
+        (re.compile(r'<[^>]+>'), ' '),
+        # Remove navigation/menu artifacts
+        (re.compile(r'\b(Get Started|Contribute|GenAI|Home|Menu|Navigation)\b', re.IGNORECASE), ''),
+        # Clean up URLs and links
+        (re.compile(r'https?://[^\s]+'), ''),
+        (re.compile(r'\[([^\]]+)\]\([^\)]+\)'), r'\1'),  # Convert [text](url) to text
+        # Remove excessive whitespace and normalize
+        (re.compile(r'\s+'), ' '),  # Multiple spaces to single
+        (re.compile(r'\n\s*\n\s*\n+'), '\n\n'),  # Multiple newlines to double
+    ]
+
+    # Create splitter (stateless, so one instance serves every file).
+    # Cleaning collapses all whitespace, newlines included, to single spaces,
+    # so "\n\n" / "\n" separators could never match and only cost extra scans.
+    text_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        separators=[". ", " ", ""]
+    )
+
     records = []
+    # Cleaned content -> (chunks, embeddings), so duplicate pages are only processed once
+    processed = {}
 
     with open(github_data.path, 'r', encoding='utf-8') as f:
         for line in f:
@@ -93,27 +128,8 @@ def chunk_and_embed(
             content = file_data['content']
 
             # AGGRESSIVE CLEANING FOR BETTER EMBEDDINGS
-
-            # Remove Hugo frontmatter (both --- and +++ styles)
-            content = re.sub(r'^\s*[+\-]{3,}.*?[+\-]{3,}\s*', '', content, flags=re.DOTALL | re.MULTILINE)
-
-            # Remove Hugo template syntax
-            content = re.sub(r'\{\{.*?\}\}', '', content, flags=re.DOTALL)
-
-            # Remove HTML comments and tags
-            content = re.sub(r'<!--.*?-->', '', content, flags=re.DOTALL)
-            content = re.sub(r'<[^>]+>', ' ', content)
-
-            # Remove navigation/menu artifacts
-            content = re.sub(r'\b(Get Started|Contribute|GenAI|Home|Menu|Navigation)\b', '', content, flags=re.IGNORECASE)
-
-            # Clean up URLs and links
-            content = re.sub(r'https?://[^\s]+', '', content)
-            content = re.sub(r'\[([^\]]+)\]\([^\)]+\)', r'\1', content)  # Convert [text](url) to text
-
-            # Remove excessive whitespace and normalize
-            content = re.sub(r'\s+', ' ', content)  # Multiple spaces to single
-            content = re.sub(r'\n\s*\n\s*\n+', '\n\n', content)  # Multiple newlines to double
+            for pattern, replacement in cleaning_rules:
+                content = pattern.sub(replacement, content)
             content = content.strip()
 
             # Skip files that are too short after cleaning
@@ -133,22 +149,20 @@ def chunk_and_embed(
 
             file_unique_id = f"{repo_name}:{file_data['path']}"
 
-            # Create splitter
-            text_splitter = RecursiveCharacterTextSplitter(
-                chunk_size=chunk_size,
-                chunk_overlap=chunk_overlap,
-                length_function=len,
-                separators=["\n\n", "\n", ". ", " ", ""]
-            )
+            if content in processed:
+                # Same cleaned text as an earlier file: reuse its chunks and embeddings
+                chunks, embeddings = processed[content]
+            else:
+                # Split into chunks
+                chunks = text_splitter.split_text(content)
 
-            # Split into chunks
-            chunks = text_splitter.split_text(content)
+                # Create embeddings (one batched forward pass per file)
+                embeddings = model.encode(chunks, batch_size=32, convert_to_numpy=True)
+                processed[content] = (chunks, embeddings)
 
             print(f"File: {file_data['path']} -> {len(chunks)} chunks (avg: {sum(len(c) for c in chunks)/len(chunks):.0f} chars)")
 
-            # Create embeddings
-            for chunk_idx, chunk in enumerate(chunks):
-                embedding = model.encode(chunk).tolist()
+            for chunk_idx, (chunk, embedding) in enumerate(zip(chunks, embeddings)):
                 records.append({
                     'file_unique_id': f"{file_unique_id}:{chunk_idx}",
                     'repo_name': repo_name,
@@ -157,7 +171,7 @@ def chunk_and_embed(
                     'citation_url': citation_url,
                     'chunk_index': chunk_idx,
                     'content_text': chunk,
-                    'embedding': embedding
+                    'embedding': embedding.tolist()
                 })
 
     print(f"Created {len(records)} total chunks")
@@ -253,6 +267,7 @@ auth:
     )
 
     records = []
+    event_timestamp = datetime.now()
     with open(embedded_data.path, 'r', encoding='utf-8') as f:
         for line in f:
             record = json.loads(line)
@@ -265,7 +280,7 @@ auth:
                 "chunk_index": record["chunk_index"],
                 "content_text": record["content_text"],
                 "vector": record["embedding"],
-                "event_timestamp": datetime.now(),
+                "event_timestamp": event_timestamp,
             })
 
     df = pd.DataFrame(records)
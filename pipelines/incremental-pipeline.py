@@ -20,6 +20,10 @@ def download_specific_files(
     from bs4 import BeautifulSoup
 
     headers = {"Authorization": f"token {github_token}"} if github_token else {}
+
+    # Reuse one keep-alive session for every API call
+    session = requests.Session()
+    session.headers.update(headers)
     
     # Parse the file paths from JSON string
     try:
@@ -31,17 +35,18 @@ def download_specific_files(
     print(f"Processing {len(file_paths_list)} changed files")
     
     files = []
+    doc_extensions = ('.md', '.html')
     
     for file_path in file_paths_list:
         # Skip non-documentation files
-        if not (file_path.endswith('.md') or file_path.endswith('.html')):
+        if not file_path.endswith(doc_extensions):
             print(f"Skipping non-doc file: {file_path}")
             continue
             
         try:
             # Get file content from GitHub API
             api_url = f"https://api.github.com/repos/{repo_owner}/{repo_name}/contents/{file_path}"
-            response = requests.get(api_url, headers=headers)
+            response = session.get(api_url)
             response.raise_for_status()
             file_data = response.json()
             
@@ -113,15 +118,14 @@ def delete_old_vectors(
                 # Get count before deletion for logging
                 query_result = collection.query(
                     expr=expr,
-                    output_fields=["id"],
-                    limit=10000
+                    output_fields=["count(*)"],
+                    consistency_level="Strong"
                 )
-                count_before = len(query_result)
+                count_before = query_result[0]["count(*)"]
                 
                 if count_before > 0:
                     # Delete the vectors
                     collection.delete(expr)
-                    collection.flush()
                     deleted_count += count_before
                     print(f"Deleted {count_before} vectors for file: {file_path}")
                 else:
@@ -161,7 +165,37 @@ def chunk_and_embed_incremental(
     model = SentenceTransformer('sentence-transformers/all-mpnet-base-v2', device=device)
     print(f"Model loaded on {device}")
 
+    # Cleaning rules as (pattern, replacement), compiled once for the whole run
+    cleaning_rules = [
+        # Remove Hugo frontmatter (both --- and +++ styles)
+        (re.compile(r'^\s*[+\-]{3,}.*?[+\-]{3,}\s*', re.DOTALL | re.MULTILINE), ''),
+        # Remove Hugo template syntax
+        (re.compile(r'\{\{.*?\}\}', re.DOTALL), ''),
+        # Remove HTML comments and tags
+        (re.compile(r'<!--.*?-->', re.DOTALL), ''),
+        (re.compile(r'<[^>]+>'), ' '),
+        # Remove navigation/menu artifacts
+        (re.compile(r'\b(Get Started|Contribute|GenAI|Home|Menu|Navigation)\b', re.IGNORECASE), ''),
+        # Clean up URLs and links
+        (re.compile(r'https?://[^\s]+'), ''),
+        (re.compile(r'\[([^\]]+)\]\([^\)]+\)'), r'\1'),  # Convert [text](url) to text
+        # Remove excessive whitespace and normalize
+        (re.compile(r'\s+'), ' '),  # Multiple spaces to single
+        (re.compile(r'\n\s*\n\s*\n+'), '\n\n'),  # Multiple newlines to double
+    ]
+
+    # Create splitter (stateless, so one instance serves every file).
+    # Cleaning collapses all whitespace, newlines included, to single spaces,
+    # so "\n\n" / "\n" separators could never match and only cost extra scans.
+    text_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        separators=[". ", " ", ""]
+    )
+
     records = []
+    # Cleaned content -> (chunks, embeddings), so duplicate pages are only processed once
+    processed = {}
 
     with open(github_data.path, 'r', encoding='utf-8') as f:
         for line in f:
@@ -169,27 +203,8 @@ def chunk_and_embed_incremental(
             content = file_data['content']
 
             # AGGRESSIVE CLEANING FOR BETTER EMBEDDINGS (same as original)
-            
-            # Remove Hugo frontmatter (both --- and +++ styles)
-            content = re.sub(r'^\s*[+\-]{3,}.*?[+\-]{3,}\s*', '', content, flags=re.DOTALL | re.MULTILINE)
-
-            # Remove Hugo template syntax
-            content = re.sub(r'\{\{.*?\}\}', '', content, flags=re.DOTALL)
-
-            # Remove HTML comments and tags
-            content = re.sub(r'<!--.*?-->', '', content, flags=re.DOTALL)
-            content = re.sub(r'<[^>]+>', ' ', content)
-
-            # Remove navigation/menu artifacts
-            content = re.sub(r'\b(Get Started|Contribute|GenAI|Home|Menu|Navigation)\b', '', content, flags=re.IGNORECASE)
-
-            # Clean up URLs and links
-            content = re.sub(r'https?://[^\s]+', '', content)
-            content = re.sub(r'\[([^\]]+)\]\([^\)]+\)', r'\1', content)  # Convert [text](url) to text
-
-            # Remove excessive whitespace and normalize
-            content = re.sub(r'\s+', ' ', content)  # Multiple spaces to single
-            content = re.sub(r'\n\s*\n\s*\n+', '\n\n', content)  # Multiple newlines to double
+            for pattern, replacement in cleaning_rules:
+                content = pattern.sub(replacement, content)
             content = content.strip()
 
             # Skip files that are too short after cleaning
@@ -209,22 +224,20 @@ def chunk_and_embed_incremental(
 
             file_unique_id = f"{repo_name}:{file_data['path']}"
 
-            # Create splitter
-            text_splitter = RecursiveCharacterTextSplitter(
-                chunk_size=chunk_size,
-                chunk_overlap=chunk_overlap,
-                length_function=len,
-                separators=["\n\n", "\n", ". ", " ", ""]
-            )
+            if content in processed:
+                # Same cleaned text as an earlier file: reuse its chunks and embeddings
+                chunks, embeddings = processed[content]
+            else:
+                # Split into chunks
+                chunks = text_splitter.split_text(content)
 
-            # Split into chunks
-            chunks = text_splitter.split_text(content)
+                # Create embeddings (one batched forward pass per file)
+                embeddings = model.encode(chunks, batch_size=32, convert_to_numpy=True)
+                processed[content] = (chunks, embeddings)
 
             print(f"File: {file_data['path']} -> {len(chunks)} chunks (avg: {sum(len(c) for c in chunks)/len(chunks):.0f} chars)")
 
-            # Create embeddings
-            for chunk_idx, chunk in enumerate(chunks):
-                embedding = model.encode(chunk).tolist()
+            for chunk_idx, (chunk, embedding) in enumerate(zip(chunks, embeddings)):
                 records.append({
                     'file_unique_id': file_unique_id,
                     'repo_name': repo_name,
@@ -233,7 +246,7 @@ def chunk_and_embed_incremental(
                     'citation_url': citation_url[:1024],
                     'chunk_index': chunk_idx,
                     'content_text': chunk[:2000],
-                    'embedding': embedding
+                    'embedding': embedding.tolist()
                 })
 
     print(f"Created {len(records)} total chunks for incremental update")
@@ -255,6 +268,8 @@ def store_milvus_incremental(
 ):
     from pymilvus import connections, utility, FieldSchema, CollectionSchema, DataType, Collection
     import json
+    import math
+    import numpy as np
     from datetime import datetime
 
     connections.connect("default", host=milvus_host, port=milvus_port)
@@ -284,57 +299,57 @@ def store_milvus_incremental(
         collection = Collection(collection_name)
         print(f"Using existing collection: {collection_name}")
 
-    # Load collection
-    collection.load()
-
-    # Prepare records for insertion
-    records = []
+    # Prepare records for insertion.
+    # Stage data column-wise (schema order, minus the auto id) so insert()
+    # doesn't have to transpose row dicts before marshaling
+    scalar_fields = ["file_unique_id", "repo_name", "file_path", "file_name",
+                     "citation_url", "chunk_index", "content_text"]
+    columns = {field: [] for field in scalar_fields}
+    vectors = []
     timestamp = int(datetime.now().timestamp())
 
     with open(embedded_data.path, 'r', encoding='utf-8') as f:
         for line in f:
             record = json.loads(line)
-            records.append({
-                "file_unique_id": record["file_unique_id"],
-                "repo_name": record["repo_name"],
-                "file_path": record["file_path"],
-                "file_name": record["file_name"],
-                "citation_url": record["citation_url"],
-                "chunk_index": record["chunk_index"],
-                "content_text": record["content_text"],
-                "vector": record["embedding"],
-                "last_updated": timestamp
-            })
+            for field in scalar_fields:
+                columns[field].append(record[field])
+            vectors.append(np.asarray(record["embedding"], dtype=np.float32))
 
-    if records:
+    num_records = len(vectors)
+    if num_records:
         # Insert new records
+        data = [columns[field] for field in scalar_fields]
+        data += [vectors, [timestamp] * num_records]
         batch_size = 1000
-        for i in range(0, len(records), batch_size):
-            batch = records[i:i + batch_size]
-            collection.insert(batch)
+        for i in range(0, num_records, batch_size):
+            collection.insert([column[i:i + batch_size] for column in data])
 
         collection.flush()
 
-        # Create/update index if needed
-        try:
-            # Check if index exists
-            index_info = collection.index()
-            if not index_info:
-                print("Creating index...")
+        # Create index if needed; a collection we can't index or load is a
+        # hard failure rather than a silently unsearchable success
+        if not collection.has_index():
+            print("Creating index...")
+            # Exact FLAT search for small corpora, otherwise IVF_FLAT
+            # with nlist ~ 4 * sqrt(N)
+            total_records = collection.num_entities
+            if total_records < 10000:
+                index_params = {"metric_type": "COSINE", "index_type": "FLAT", "params": {}}
+            else:
                 index_params = {
                     "metric_type": "COSINE",
-                    "index_type": "IVF_FLAT", 
-                    "params": {"nlist": min(1024, max(100, len(records)))}
+                    "index_type": "IVF_FLAT",
+                    "params": {"nlist": min(1024, int(4 * math.sqrt(total_records)))}
                 }
-                collection.create_index("vector", index_params)
-                collection.load()
-                print("Index created successfully")
-            else:
-                print("Index already exists")
-        except Exception as e:
-            print(f"Index operation result: {e}")
+            collection.create_index("vector", index_params)
+            print("Index created successfully")
+        else:
+            print("Index already exists")
+
+        # Single load, after the index is guaranteed to exist
+        collection.load()
 
-        print(f"✅ Inserted {len(records)} new records. Total collection size: {collection.num_entities}")
+        print(f"✅ Inserted {num_records} new records. Total collection size: {collection.num_entities}")
     else:
         print("No records to insert")
 
@@ -20,18 +20,23 @@ def download_github_directory(
     from bs4 import BeautifulSoup
 
     headers = {"Authorization": f"token {github_token}"} if github_token else {}
+
+    # Reuse one keep-alive session for every API call
+    session = requests.Session()
+    session.headers.update(headers)
     api_url = f"https://api.github.com/repos/{repo_owner}/{repo_name}/contents/{directory_path}"
+    doc_extensions = ('.md', '.html')
 
     def get_files_recursive(url):
         files = []
         try:
-            response = requests.get(url, headers=headers)
+            response = session.get(url)
             response.raise_for_status()
             items = response.json()
 
             for item in items:
-                if item['type'] == 'file' and (item['name'].endswith('.md') or item['name'].endswith('.html')):
-                    file_response = requests.get(item['url'], headers=headers)
+                if item['type'] == 'file' and item['name'].endswith(doc_extensions):
+                    file_response = session.get(item['url'])
                     file_response.raise_for_status()
                     file_data = file_response.json()
                     content = base64.b64decode(file_data['content']).decode('utf-8')
@@ -89,19 +94,31 @@ def download_github_issues(
     headers = {"Authorization": f"token {github_token}"} if github_token else {}
     all_issues = []
 
+    # Reuse one keep-alive session for every API call
+    session = requests.Session()
+    session.headers.update(headers)
+
     def api_request(url, params=None):
         """Make GitHub API request with rate limit handling."""
         max_retries = 3
         for attempt in range(max_retries):
             try:
-                resp = requests.get(url, params=params, headers=headers)
+                resp = session.get(url, params=params)
                 
                 # Handle rate limiting
                 if resp.status_code == 403:
                     remaining = resp.headers.get("X-RateLimit-Remaining", "0")
                     if remaining == "0":
-                        reset_time = int(resp.headers.get("X-RateLimit-Reset", 0))
-                        wait_time = max(reset_time - int(time.time()), 60)
+                        reset_header = resp.headers.get("X-RateLimit-Reset")
+                        retry_after = resp.headers.get("Retry-After")
+                        if reset_header:
+                            # Primary limit: sleep until the window resets
+                            wait_time = max(int(reset_header) - int(time.time()), 0) + 1
+                        elif retry_after:
+                            wait_time = int(retry_after)
+                        else:
+                            # Secondary limit without hints: GitHub asks for at least a minute
+                            wait_time = 60
                         print(f"Rate limited. Waiting {wait_time}s...")
                         time.sleep(min(wait_time, 300))  # Max 5 min wait
                         continue
@@ -121,7 +138,7 @@ def download_github_issues(
     def fetch_comments(owner, name, issue_number):
         """Fetch all comments for a single issue."""
         comments_url = f"https://api.github.com/repos/{owner}/{name}/issues/{issue_number}/comments"
-        comments_text = ""
+        comment_parts = []
         page = 1
         
         while True:
@@ -133,13 +150,14 @@ def download_github_issues(
                 author = comment.get("user", {}).get("login", "unknown")
                 created = comment.get("created_at", "")[:10]
                 body = comment.get("body", "") or ""
-                comments_text += f"\n\n---\n**Comment by @{author}** ({created}):\n{body}"
+                comment_parts.append(f"\n\n---\n**Comment by @{author}** ({created}):\n{body}")
             
             if len(comments) < 100:
                 break
             page += 1
         
-        return comments_text
+        # Join once instead of re-copying the growing string per comment
+        return "".join(comment_parts)
 
     for repo in repos.split(","):
         repo = repo.strip()
@@ -236,7 +254,37 @@ def chunk_and_embed(
     model = SentenceTransformer('sentence-transformers/all-mpnet-base-v2', device=device)
     print(f"Model loaded on {device}")
 
+    # Cleaning rules as (pattern, replacement), compiled once for the whole run
+    cleaning_rules = [
+        # Remove Hugo frontmatter (both --- and +++ styles)
+        (re.compile(r'^\s*[+\-]{3,}.*?[+\-]{3,}\s*', re.DOTALL | re.MULTILINE), ''),
+        # Remove Hugo template syntax
+        (re.compile(r'\{\{.*?\}\}', re.DOTALL), ''),
+        # Remove HTML comments and tags
+        (re.compile(r'<!--.*?-->', re.DOTALL), ''),
+        (re.compile(r'<[^>]+>'), ' '),
+        # Remove navigation/menu artifacts
+        (re.compile(r'\b(Get Started|Contribute|GenAI|Home|Menu|Navigation)\b', re.IGNORECASE), ''),
+        # Clean up URLs and links
+        (re.compile(r'https?://[^\s]+'), ''),
+        (re.compile(r'\[([^\]]+)\]\([^\)]+\)'), r'\1'),  # Convert [text](url) to text
+        # Remove excessive whitespace and normalize
+        (re.compile(r'\s+'), ' '),  # Multiple spaces to single
+        (re.compile(r'\n\s*\n\s*\n+'), '\n\n'),  # Multiple newlines to double
+    ]
+
+    # Create splitter (stateless, so one instance serves every file).
+    # Cleaning collapses all whitespace, newlines included, to single spaces,
+    # so "\n\n" / "\n" separators could never match and only cost extra scans.
+    text_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        separators=[". ", " ", ""]
+    )
+
     records = []
+    # Cleaned content -> (chunks, embeddings), so duplicate pages are only processed once
+    processed = {}
 
     with open(github_data.path, 'r', encoding='utf-8') as f:
         for line in f:
@@ -244,27 +292,8 @@ def chunk_and_embed(
             content = file_data['content']
 
             # AGGRESSIVE CLEANING FOR BETTER EMBEDDINGS
-
-            # Remove Hugo frontmatter (both --- and +++ styles)
-            content = re.sub(r'^\s*[+\-]{3,}.*?[+\-]{3,}\s*', '', content, flags=re.DOTALL | re.MULTILINE)
-
-            # Remove Hugo template syntax
-            content = re.sub(r'\{\{.*?\}\}', '', content, flags=re.DOTALL)
-
-            # Remove HTML comments and tags
-            content = re.sub(r'<!--.*?-->', '', content, flags=re.DOTALL)
-            content = re.sub(r'<[^>]+>', ' ', content)
-
-            # Remove navigation/menu artifacts
-            content = re.sub(r'\b(Get Started|Contribute|GenAI|Home|Menu|Navigation)\b', '', content, flags=re.IGNORECASE)
-
-            # Clean up URLs and links
-            content = re.sub(r'https?://[^\s]+', '', content)
-            content = re.sub(r'\[([^\]]+)\]\([^\)]+\)', r'\1', content)  # Convert [text](url) to text
-
-            # Remove excessive whitespace and normalize
-            content = re.sub(r'\s+', ' ', content)  # Multiple spaces to single
-            content = re.sub(r'\n\s*\n\s*\n+', '\n\n', content)  # Multiple newlines to double
+            for pattern, replacement in cleaning_rules:
+                content = pattern.sub(replacement, content)
             content = content.strip()
 
             # Skip files that are too short after cleaning
@@ -284,22 +313,20 @@ def chunk_and_embed(
 
             file_unique_id = f"{repo_name}:{file_data['path']}"
 
-            # Create splitter
-            text_splitter = RecursiveCharacterTextSplitter(
-                chunk_size=chunk_size,
-                chunk_overlap=chunk_overlap,
-                length_function=len,
-                separators=["\n\n", "\n", ". ", " ", ""]
-            )
+            if content in processed:
+                # Same cleaned text as an earlier file: reuse its chunks and embeddings
+                chunks, embeddings = processed[content]
+            else:
+                # Split into chunks
+                chunks = text_splitter.split_text(content)
 
-            # Split into chunks
-            chunks = text_splitter.split_text(content)
+                # Create embeddings (one batched forward pass per file)
+                embeddings = model.encode(chunks, batch_size=32, convert_to_numpy=True)
+                processed[content] = (chunks, embeddings)
 
             print(f"File: {file_data['path']} -> {len(chunks)} chunks (avg: {sum(len(c) for c in chunks)/len(chunks):.0f} chars)")
 
-            # Create embeddings
-            for chunk_idx, chunk in enumerate(chunks):
-                embedding = model.encode(chunk).tolist()
+            for chunk_idx, (chunk, embedding) in enumerate(zip(chunks, embeddings)):
                 records.append({
                     'file_unique_id': file_unique_id,
                     'repo_name': repo_name,
@@ -308,7 +335,7 @@ def chunk_and_embed(
                     'citation_url': citation_url[:1024],
                     'chunk_index': chunk_idx,
                     'content_text': chunk[:2000],
-                    'embedding': embedding
+                    'embedding': embedding.tolist()
                 })
 
     print(f"Created {len(records)} total chunks")
@@ -330,6 +357,8 @@ def store_milvus(
 ):
     from pymilvus import connections, utility, FieldSchema, CollectionSchema, DataType, Collection
     import json
+    import math
+    import numpy as np
     from datetime import datetime
 
     connections.connect("default", host=milvus_host, port=milvus_port)
@@ -358,42 +387,44 @@ def store_milvus(
     collection = Collection(collection_name, schema)
     print(f"Created new collection: {collection_name}")
 
-    # Rest of your existing code remains the same...
-    records = []
+    # Stage data column-wise (schema order, minus the auto id) so insert()
+    # doesn't have to transpose row dicts before marshaling
+    scalar_fields = ["file_unique_id", "repo_name", "file_path", "file_name",
+                     "citation_url", "chunk_index", "content_text"]
+    columns = {field: [] for field in scalar_fields}
+    vectors = []
     timestamp = int(datetime.now().timestamp())
 
     with open(embedded_data.path, 'r', encoding='utf-8') as f:
         for line in f:
             record = json.loads(line)
-            records.append({
-                "file_unique_id": record["file_unique_id"],
-                "repo_name": record["repo_name"],
-                "file_path": record["file_path"],
-                "file_name": record["file_name"],
-                "citation_url": record["citation_url"],
-                "chunk_index": record["chunk_index"],
-                "content_text": record["content_text"],
-                "vector": record["embedding"],
-                "last_updated": timestamp
-            })
-
-    if records:
+            for field in scalar_fields:
+                columns[field].append(record[field])
+            vectors.append(np.asarray(record["embedding"], dtype=np.float32))
+
+    num_records = len(vectors)
+    if num_records:
+        data = [columns[field] for field in scalar_fields]
+        data += [vectors, [timestamp] * num_records]
         batch_size = 1000
-        for i in range(0, len(records), batch_size):
-            batch = records[i:i + batch_size]
-            collection.insert(batch)
+        for i in range(0, num_records, batch_size):
+            collection.insert([column[i:i + batch_size] for column in data])
 
         collection.flush()
 
-        # Create index
-        index_params = {
-            "metric_type": "COSINE",
-            "index_type": "IVF_FLAT", 
-            "params": {"nlist": min(1024, len(records))}
-        }
+        # Create index: exact FLAT search for small corpora, otherwise
+        # IVF_FLAT with nlist ~ 4 * sqrt(N)
+        if num_records < 10000:
+            index_params = {"metric_type": "COSINE", "index_type": "FLAT", "params": {}}
+        else:
+            index_params = {
+                "metric_type": "COSINE",
+                "index_type": "IVF_FLAT",
+                "params": {"nlist": min(1024, int(4 * math.sqrt(num_records)))}
+            }
         collection.create_index("vector", index_params)
         collection.load()
-        print(f"✅ Inserted {len(records)} records. Total: {collection.num_entities}")
+        print(f"✅ Inserted {num_records} records. Total: {collection.num_entities}")
 
 
 @dsl.pipeline(
@@ -1,12 +1,18 @@
 import os
 import json
+import threading
+import asyncio
 import httpx
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException
 from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 import uvicorn
 from typing import Dict, Any, List, Optional, AsyncGenerator
+from functools import lru_cache
+import numpy as np
+import torch
 from sentence_transformers import SentenceTransformer
 from pymilvus import connections, Collection
 
@@ -21,6 +27,7 @@ MILVUS_PORT = os.getenv("MILVUS_PORT", "19530")
 MILVUS_COLLECTION = os.getenv("MILVUS_COLLECTION", "docs_rag")
 MILVUS_VECTOR_FIELD = os.getenv("MILVUS_VECTOR_FIELD", "vector")
 EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-mpnet-base-v2")
+MILVUS_SEARCH_PARAMS = {"metric_type": "COSINE", "params": {"nprobe": 32}}
 
 # System prompt (same as WebSocket version)
 SYSTEM_PROMPT = """
@@ -96,7 +103,17 @@ TOOLS = [
     }
 ]
 
-app = FastAPI(title="Kubeflow Docs API Service", version="1.0.0")
+_warm_up_task: Optional[asyncio.Task] = None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Warm up in the background so the server starts listening (and passing probes) immediately"""
+    global _warm_up_task
+    _warm_up_task = asyncio.create_task(asyncio.to_thread(warm_up))
+    yield
+
+app = FastAPI(title="Kubeflow Docs API Service", version="1.0.0", lifespan=lifespan)
 
 # Add CORS middleware
 app.add_middleware(
@@ -111,24 +128,78 @@ class ChatRequest(BaseModel):
     message: str
     stream: Optional[bool] = True
 
+_encoder: SentenceTransformer = None
+# Guards lazy init: background warm-up and the first search may race to load
+_init_lock = threading.Lock()
+
+
+def _get_encoder() -> SentenceTransformer:
+    """Load the embedding model once; use FP16 weights when a GPU is available."""
+    global _encoder
+    with _init_lock:
+        if _encoder is None:
+            if torch.cuda.is_available():
+                _encoder = SentenceTransformer(EMBEDDING_MODEL, device="cuda").half()
+            else:
+                _encoder = SentenceTransformer(EMBEDDING_MODEL)
+    return _encoder
+
+
+@lru_cache(maxsize=1024)
+def _embed_query(query: str) -> np.ndarray:
+    """Embed a search query; the model often repeats refined queries, so cache them."""
+    # Compact float32 array, read-only because cached entries are shared between calls
+    vec = np.asarray(_get_encoder().encode(query), dtype=np.float32)
+    vec.flags.writeable = False
+    return vec
+
+
+def _ensure_milvus_connection() -> None:
+    """Open the shared Milvus connection once and reuse it across searches."""
+    if not connections.has_connection("default"):
+        connections.connect(alias="default", host=MILVUS_HOST, port=MILVUS_PORT)
+
+
+_collection: Collection = None
+
+
+def _get_collection() -> Collection:
+    """Return the docs collection, loading it into memory on first use only."""
+    global _collection
+    with _init_lock:
+        if _collection is None:
+            _ensure_milvus_connection()
+            collection = Collection(MILVUS_COLLECTION)
+            collection.load()
+            _collection = collection
+        return _collection
+
+
+def warm_up() -> None:
+    """Load the encoder and the Milvus collection before the first request needs them."""
+    try:
+        _get_encoder().encode("warm up")
+        _get_collection()
+        print("✅ Encoder and Milvus collection warmed up")
+    except Exception as e:
+        print(f"[WARN] Warm-up failed, will retry on first search: {e}")
+
+
 def milvus_search(query: str, top_k: int = 5) -> Dict[str, Any]:
     """Execute a semantic search in Milvus and return structured JSON serializable results."""
+    global _collection
     try:
-        # Connect to Milvus
-        connections.connect(alias="default", host=MILVUS_HOST, port=MILVUS_PORT)
-        collection = Collection(MILVUS_COLLECTION)
-        collection.load()
+        collection = _get_collection()
 
         # Encoder (same model as pipeline)
-        encoder = SentenceTransformer(EMBEDDING_MODEL)
-        query_vec = encoder.encode(query).tolist()
+        query_vec = _embed_query(query)
 
-        search_params = {"metric_type": "COSINE", "params": {"nprobe": 32}}
         results = collection.search(
             data=[query_vec],
             anns_field=MILVUS_VECTOR_FIELD,
-            param=search_params,
-            limit=int(top_k),
+            param=MILVUS_SEARCH_PARAMS,
+            # The tool schema caps top_k at 10; don't let the model over-fetch
+            limit=min(max(int(top_k), 1), 10),
             output_fields=["file_path", "content_text", "citation_url"],
         )
 
@@ -149,12 +220,13 @@ def milvus_search(query: str, top_k: int = 5) -> Dict[str, Any]:
         return {"results": hits}
     except Exception as e:
         print(f"[ERROR] Milvus search failed: {e}")
-        return {"results": []}
-    finally:
+        # Drop the connection so the next search starts from a fresh channel
+        _collection = None
         try:
             connections.disconnect(alias="default")
         except Exception:
             pass
+        return {"results": []}
 
 async def execute_tool(tool_call: Dict[str, Any]) -> tuple[str, List[str]]:
     """Execute a tool call and return the result and citations"""
@@ -167,7 +239,8 @@ async def execute_tool(tool_call: Dict[str, Any]) -> tuple[str, List[str]]:
             top_k = arguments.get("top_k", 5)
             
             print(f"[TOOL] Executing Milvus search for: '{query}' (top_k={top_k})")
-            result = milvus_search(query, top_k)
+            # Run the blocking search off the event loop so other clients and /health stay responsive
+            result = await asyncio.to_thread(milvus_search, query, top_k)
             
             # Collect citations
             citations = []
@@ -175,7 +248,7 @@ async def execute_tool(tool_call: Dict[str, Any]) -> tuple[str, List[str]]:
             
             for hit in result.get("results", []):
                 citation_url = hit.get('citation_url', '')
-                if citation_url and citation_url not in citations:
+                if citation_url:
                     citations.append(citation_url)
                 
                 formatted_results.append(
@@ -186,7 +259,8 @@ async def execute_tool(tool_call: Dict[str, Any]) -> tuple[str, List[str]]:
                 )
             
             formatted_text = "\n".join(formatted_results) if formatted_results else "No relevant results found."
-            return formatted_text, citations
+            # Remove duplicates while preserving order
+            return formatted_text, list(dict.fromkeys(citations))
         
         return f"Unknown tool: {function_name}", []
         
@@ -297,10 +371,7 @@ async def stream_llm_response(payload: Dict[str, Any]) -> AsyncGenerator[str, No
         # Send citations if any were collected
         if citations_collector:
             # Remove duplicates while preserving order
-            unique_citations = []
-            for citation in citations_collector:
-                if citation not in unique_citations:
-                    unique_citations.append(citation)
+            unique_citations = list(dict.fromkeys(citations_collector))
             
             yield f"data: {json.dumps({'type': 'citations', 'citations': unique_citations})}\n\n"
         
@@ -429,10 +500,7 @@ async def chat(request: ChatRequest):
             response_content, citations = await get_non_streaming_response(payload)
             
             # Remove duplicates from citations while preserving order
-            unique_citations = []
-            for citation in citations:
-                if citation not in unique_citations:
-                    unique_citations.append(citation)
+            unique_citations = list(dict.fromkeys(citations))
             
             return {
                 "response": response_content,